@@ -0,0 +1,160 @@
+import asyncio
+import inspect
+import io
+
+from .parser import Parser
+from .renderer import Renderer
+
+
+async def _maybe_await(value):
+    if inspect.isawaitable(value):
+        value = await value
+    return value
+
+
+async def _run(executor, func, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, func, *args)
+
+
+# Module-level, so they can be pickled for a ProcessPoolExecutor.
+
+def _parse(parser, lines):
+    return parser.parse(lines)
+
+
+def _render_to_string(renderer, blocks):
+    return ''.join(renderer.render(blocks))
+
+
+class AsyncParser:
+
+    """Parse from an async line source without blocking the event loop.
+
+    Small documents are parsed inline; documents larger than threshold
+    characters are parsed in executor (None means the loop default;
+    a ProcessPoolExecutor works too).
+
+    Sources of bytes (like asyncio.StreamReader or aiohttp's
+    request.content) are decoded with encoding, UTF-8 by default.
+
+    """
+
+    threshold = 64 * 1024
+
+    def __init__(self, parser=None, executor=None, threshold=None):
+        self.parser = parser or Parser()
+        self.executor = executor
+        if threshold is not None:
+            self.threshold = threshold
+
+    async def read_lines(self, lines):
+        if hasattr(lines, '__aiter__'):
+            rv = []
+            async for line in lines:
+                rv.append(line)
+        elif isinstance(lines, (list, tuple)):
+            rv = lines
+        else:
+            # Reading a file blocks, so it's done in executor too.
+            rv = await _run(self.executor, list, lines)
+        return rv
+
+    def decode(self, lines, encoding=None):
+        if isinstance(lines, (bytes, bytearray)):
+            data = lines
+        elif lines and isinstance(lines[0], (bytes, bytearray)):
+            data = b''.join(lines)
+        else:
+            return lines
+        # Translate newlines like open() does for the markdown file.
+        return list(io.StringIO(data.decode(encoding or 'utf-8'), newline=None))
+
+    async def parse(self, lines, encoding=None):
+        if not isinstance(lines, (str, bytes, bytearray)):
+            lines = await self.read_lines(lines)
+        lines = self.decode(lines, encoding)
+        size = len(lines) if isinstance(lines, str) else sum(map(len, lines))
+
+        if size > self.threshold:
+            return await _run(self.executor, _parse, self.parser, lines)
+        return self.parser.parse(lines)
+
+
+class AsyncRenderer:
+
+    """Render to an async writer without blocking the event loop.
+
+    The writer needs a write() method; if it returns an awaitable,
+    it is awaited. If the writer has a drain() method (like
+    asyncio.StreamWriter), it is awaited after every chunk.
+
+    Chunks are written as str, unless encoding is given, in which case
+    they are encoded first (e.g. for asyncio.StreamWriter or aiohttp's
+    StreamResponse). Writers that are asyncio.StreamWriter instances
+    get UTF-8 by default.
+
+    Documents with more than threshold items are rendered in executor.
+
+    """
+
+    threshold = 1000
+    chunk_size = 64 * 1024
+
+    def __init__(self, renderer=None, executor=None, threshold=None):
+        self.renderer = renderer or Renderer()
+        self.executor = executor
+        if threshold is not None:
+            self.threshold = threshold
+
+    async def render(self, blocks, file=None, encoding=None):
+        if sum(len(b.items) for b in blocks) > self.threshold:
+            text = await _run(self.executor, _render_to_string, self.renderer, blocks)
+        else:
+            text = _render_to_string(self.renderer, blocks)
+
+        if file is None:
+            return text
+
+        if encoding is None and isinstance(file, asyncio.StreamWriter):
+            encoding = 'utf-8'
+
+        drain = getattr(file, 'drain', None)
+        for start in range(0, len(text), self.chunk_size):
+            chunk = text[start:start + self.chunk_size]
+            if encoding is not None:
+                chunk = chunk.encode(encoding)
+            await _maybe_await(file.write(chunk))
+            if drain:
+                await drain()
+
+
+async def process(blocks, processors):
+    """Apply processors to blocks in order.
+
+    Processors are called with blocks, like the ones returned by the cli
+    commands; processors returning an awaitable (e.g. async functions)
+    are awaited before the next one runs.
+
+    """
+    for processor in processors:
+        await _maybe_await(processor(blocks))
+    return blocks
+
+
+async def process_file(processors, lines, file, parser=None, renderer=None, encoding=None):
+    """Async equivalent of tasklist.cli.process_file.
+
+    Parse blocks from lines, apply processors to them, and render the
+    result to file; encoding is used for both (see AsyncParser and
+    AsyncRenderer).
+
+    """
+    blocks = await (parser or AsyncParser()).parse(lines, encoding)
+    await process(blocks, processors)
+    await (renderer or AsyncRenderer()).render(blocks, file, encoding)
+    return blocks
+
+
+parse = AsyncParser().parse
+render = AsyncRenderer().render
@@ -12,25 +12,58 @@ def cli(file):
 
 @cli.resultcallback()
 def process_file(processors, file):
-    try:
-        with open(file.name) as f:
-            blocks = parse(f)
-    except FileNotFoundError:
-        blocks = []
+    # watch never returns, so it must be last; the commands before it
+    # are applied and saved before it starts.
+    watch = None
+    if processors and getattr(processors[-1], 'watch', False):
+        *processors, watch = processors
+    if any(getattr(processor, 'watch', False) for processor in processors):
+        raise click.UsageError("watch must be the last command")
 
-    for processor in processors:
-        processor(blocks)
+    # watch parses the file itself, and keeps going if it's invalid.
+    if processors or not watch:
+        try:
+            with open(file.name) as f:
+                blocks = parse(f)
+        except FileNotFoundError:
+            blocks = []
 
-    render(blocks, file)
+        for processor in processors:
+            processor(blocks)
+
+        render(blocks, file)
+
+    if watch:
+        file.close()
+        watch()
 
 
 @cli.command()
 @click.argument('name')
 @click.option('--bind-move', nargs=2, metavar='KEY NAME')
-def edit(name, bind_move):
-    from .editor import edit
+@click.option('--replay', type=click.File('r'),
+              help="Run headless, reading keys from FILE (one per line).")
+@click.option('--size', nargs=2, type=int, default=(80, 24), metavar='COLS ROWS',
+              help="Screen size for --replay.")
+@click.option('--timings', is_flag=True,
+              help="With --replay, print per-key handling and render times to stderr.")
+def edit(name, bind_move, replay, size, timings):
+    from .editor import edit, edit_headless, is_key
     from .types import Block, Heading
 
+    keys = None
+    if replay:
+        keys = []
+        for line_no, line in enumerate(replay, 1):
+            key = line.rstrip('\n')
+            if not key:
+                continue
+            if not is_key(key):
+                raise click.BadParameter(
+                    "unknown key on line {}: {!r}".format(line_no, key),
+                    param_hint='--replay')
+            keys.append(key)
+
     def processor(blocks):
         move_key, move_target = bind_move if bind_move else (None, None)
 
@@ -41,7 +74,16 @@ def edit(name, bind_move):
             block = Block(Heading(name, 1), [])
             blocks.append(block)
 
-        items, moved_items = edit(list(block.items), block.heading, move_key=move_key)
+        if keys is None:
+            items, moved_items = edit(list(block.items), block.heading, move_key=move_key)
+        else:
+            items, moved_items, key_timings = edit_headless(
+                list(block.items), block.heading, keys, size=size, move_key=move_key)
+            if timings:
+                for timing in key_timings:
+                    click.echo("{}\t{:.6f}\t{:.6f}".format(
+                        timing.key, timing.keypress, timing.render), err=True)
+
         block.items[:] = items
 
         if move_key and moved_items:
@@ -123,6 +165,72 @@ def set_(name, checked, priority):
     return processor
 
 
+@cli.command()
+@click.argument('output', type=click.Path(dir_okay=False, writable=True, allow_dash=True))
+@click.option('--format', 'format_', type=click.Choice(['ndjson', 'binary']), default='ndjson')
+def export(output, format_):
+    from .interchange import export_blocks, binary_formats
+
+    def processor(blocks):
+        mode = 'wb' if format_ in binary_formats else 'w'
+        with click.open_file(output, mode, atomic=True) as f:
+            export_blocks(blocks, f, format_)
+
+    return processor
+
+
+@cli.command('import')
+@click.argument('input', type=click.Path(dir_okay=False, allow_dash=True))
+@click.option('--format', 'format_', type=click.Choice(['ndjson', 'binary']), default='ndjson')
+def import_(input, format_):
+    from .interchange import import_blocks, binary_formats
+
+    def processor(blocks):
+        mode = 'rb' if format_ in binary_formats else 'r'
+        with click.open_file(input, mode) as f:
+            blocks[:] = import_blocks(f, format_)
+
+    return processor
+
+
+@cli.command()
+@click.option('--interval', type=float, default=.5, show_default=True,
+              help="Seconds between checks when polling.")
+@click.option('--polling', is_flag=True,
+              help="Poll the file instead of using inotify.")
+@click.pass_context
+def watch(ctx, interval, polling):
+    """Print changes to FILE as they happen.
+
+    Must be the last command; the commands before it are applied
+    and saved first.
+
+    """
+    from .parser import ParseError
+    from .watch import IncrementalParser, make_watcher, read_text, format_change
+
+    path = ctx.find_root().params['file'].name
+
+    def processor():
+        parser = IncrementalParser()
+        watcher = make_watcher(path, interval, polling)
+        try:
+            while True:
+                try:
+                    changes = parser.update(read_text(path))
+                except ParseError as e:
+                    click.echo("error: {}".format(e), err=True)
+                else:
+                    for change in changes:
+                        click.echo(format_change(change))
+                watcher.wait()
+        finally:
+            watcher.close()
+
+    processor.watch = True
+    return processor
+
+
 
 if __name__ == '__main__':
     cli()
@@ -1,3 +1,6 @@
+import time
+from collections import namedtuple
+
 import urwid
 
 from .types import Item, Heading
@@ -85,41 +88,35 @@ class LostFocusMonitor:
 
     Child widgets must declare they emit lost_focus; see EmitsLostFocus.
 
-    Warning: This uses a private method of the container class, so it might
-    break at any time, or have unintended consequences. Known to work with
-    Pile and Column containers, no guarantees about others.
+    This hooks into the focus changed callback of the container's list of
+    children, so work is done only when the focus actually changes,
+    not on every invalidation.
 
-    """
+    Warning: This replaces the callback of a private attribute of the
+    container class, so it might break at any time, or have unintended
+    consequences. Known to work with Pile, Columns and ListBox (with a
+    SimpleFocusListWalker) containers, no guarantees about others.
 
-    # Assumes parent does the following in constructor:
-    # self._contents.set_focus_changed_callback(lambda f: self._invalidate())
+    """
 
     def __init__(self, *args, **kwargs):
-        self._old_focus_position = None
         super().__init__(*args, **kwargs)
+        self._focus_list().set_focus_changed_callback(self._focus_changed)
 
-    def _invalidate(self):
-        super()._invalidate()
-
-        # self.focus_position raises IndexError if there's no contents.
-        if not self.contents:
-            return
-
-        if self._old_focus_position != self.focus_position:
-            self._old_focus_position = self.focus_position
-
-            # Only the last, non-container widget emits lost_focus.
-            widget = self
-            while hasattr(widget, 'contents'):
+    def _focus_list(self):
+        """Return the MonitoredFocusList holding the children."""
+        return self._contents
 
-                # We ignore when containers disappear.
-                # Not sure this is entirely correct.
-                try:
-                    widget_options = widget.contents[widget.focus_position]
-                except IndexError:
-                    return
-                widget, _ = widget_options
+    def _focus_changed(self, new_focus):
+        # Pile and Columns do this in their own callback, which we replace.
+        self._invalidate()
 
+        # Called before the focus changes, so self.focus is the old one.
+        # Only the last, non-container widget emits lost_focus.
+        widget = self.focus
+        while hasattr(widget, 'contents'):
+            widget = widget.focus
+        if widget is not None:
             urwid.emit_signal(widget, 'lost_focus')
 
 
@@ -178,6 +175,9 @@ class FancyCheckBox(LostFocusMonitor, urwid.Columns):
         ], dividechars=1)
 
         def disable_label():
+            # Moving the focus away from the label emits lost_focus again.
+            if not self.label.enabled:
+                return
             self.label.enabled = False
             self.focus_position = 0
 
@@ -190,6 +190,8 @@ class FancyCheckBox(LostFocusMonitor, urwid.Columns):
 
         if key == 'x':
             self.checkbox.toggle_state()
+            # A pack column's width depends on its text; the cached canvas
+            # does not know about that, so it would show the old state.
             self._invalidate()
             return None
 
@@ -198,7 +200,7 @@ class FancyCheckBox(LostFocusMonitor, urwid.Columns):
             self.focus_position = 3
             return None
 
-        if key in 'abcd':
+        if key in ('a', 'b', 'c', 'd'):
             self.priority.set_state({
                 'a': 'a',
                 'b': 'b',
@@ -211,29 +213,43 @@ class FancyCheckBox(LostFocusMonitor, urwid.Columns):
         return key
 
 
-class CheckBoxList(LostFocusMonitor, urwid.Pile):
+class CheckBoxList(LostFocusMonitor, urwid.ListBox):
 
-    def __init__(self, *args, move_key=None, move_target=None, **kwargs):
-        super().__init__(*args, **kwargs)
+    """A list of FancyCheckBox widgets.
+
+    A ListBox renders only the rows that are visible, and the canvases
+    of rows that did not change are reused from the cache, so the cost
+    of a keypress does not grow with the number of items.
+
+    """
+
+    def __init__(self, widgets, move_key=None, move_target=None):
+        super().__init__(urwid.SimpleFocusListWalker(widgets))
         assert (move_key is None) + (move_target is None) != 1, (
             "either none or both of move_key and move_target must be given")
         self.move_key = move_key
         self.move_target = move_target
 
+        self.body.set_validate_contents_modified(self._contents_modified)
+        for widget in self.body:
+            urwid.connect_signal(widget.priority, 'change', self._focus_on_the_next_element)
+
+    def _focus_list(self):
+        return self.body
 
     # So we still have focus when there's no child element.
     def selectable(self):
         return True
 
-    def _contents_modified(self, slc, new_items):
-        super()._contents_modified(slc, new_items)
-
-        def focus_on_the_next_element(_, __):
-            if self.focus_position < len(self.contents) - 1:
-                self.focus_position += 1
+    def _contents_modified(self, indices, new_items):
+        for widget in self.body[slice(*indices)]:
+            urwid.disconnect_signal(widget.priority, 'change', self._focus_on_the_next_element)
+        for widget in new_items:
+            urwid.connect_signal(widget.priority, 'change', self._focus_on_the_next_element)
 
-        for widget, _ in new_items:
-            urwid.connect_signal(widget.priority, 'change', focus_on_the_next_element)
+    def _focus_on_the_next_element(self, _, __):
+        if self.focus_position < len(self.body) - 1:
+            self.focus_position += 1
 
     def keypress(self, size, key):
         if not super().keypress(size, key):
@@ -243,30 +259,29 @@ class CheckBoxList(LostFocusMonitor, urwid.Pile):
 
         if key == 'n':
             checkbox = FancyCheckBox()
-            self.contents.append((checkbox, ('weight', 1)))
-            self.focus_position = len(self.contents) - 1
+            self.body.append(checkbox)
+            # Setting focus_position is completed only on the next render,
+            # after temporarily restoring the old focus, which would make
+            # the label lose focus right away; this happens immediately.
+            self.change_focus(size, len(self.body) - 1, size[1], 'above')
             checkbox.keypress((100, ), 'e')
             return None
 
         if key == 'r':
-            if self.contents:
-                del self.contents[self.focus_position]
-                if self.contents and self.focus_position > len(self.contents):
-                    self.focus_position = len(self.contents) - 1
+            if self.body:
+                del self.body[self.focus_position]
             return None
 
         if self.move_key and key == self.move_key:
-            if self.contents:
-                self.move_target.append(self.contents[self.focus_position])
-                del self.contents[self.focus_position]
-                if self.contents and self.focus_position > len(self.contents):
-                    self.focus_position = len(self.contents) - 1
+            if self.body:
+                self.move_target.append(self.focus)
+                del self.body[self.focus_position]
             return None
 
         return key
 
 
-def edit(items, heading, move_key=None):
+def make_widget(items, heading, move_key=None):
     move_target = []
 
     checkboxlist = CheckBoxList(
@@ -283,31 +298,110 @@ def edit(items, heading, move_key=None):
     )
 
     pile = urwid.Pile([
-        urwid.Text('{} {}\n'.format('#' * heading.level, heading.text)),
+        ('pack', urwid.Text('{} {}\n'.format('#' * heading.level, heading.text))),
         checkboxlist,
     ])
 
-    fill = urwid.Filler(pile, 'top')
+    return pile, checkboxlist, move_target
 
-    def exit_on_q(key):
-        if key in ('q', 'Q'):
-            raise urwid.ExitMainLoop()
 
-    loop = urwid.MainLoop(fill, unhandled_input=exit_on_q)
-    loop.run()
+def exit_on_q(key):
+    if key in ('q', 'Q'):
+        raise urwid.ExitMainLoop()
+
+
+def get_items(checkboxlist, move_target):
 
     def fancy_check_box_list_to_items(l):
         return [
             Item(fcb.label.get_edit_text(), fcb.checkbox.state, fcb.priority.state)
-            for fcb, _ in l
+            for fcb in l
         ]
 
     return (
-        fancy_check_box_list_to_items(checkboxlist.contents),
+        fancy_check_box_list_to_items(checkboxlist.body),
         fancy_check_box_list_to_items(move_target),
     )
 
 
+def edit(items, heading, move_key=None):
+    widget, checkboxlist, move_target = make_widget(items, heading, move_key)
+
+    loop = urwid.MainLoop(widget, unhandled_input=exit_on_q)
+    loop.run()
+
+    return get_items(checkboxlist, move_target)
+
+
+KeyTiming = namedtuple('KeyTiming', 'key keypress render')
+
+
+KEY_MODIFIERS = ('shift ', 'meta ', 'ctrl ')
+
+
+def strip_key_modifiers(key):
+    while key.startswith(KEY_MODIFIERS):
+        key = key.split(' ', 1)[1]
+    return key
+
+
+KEY_NAMES = {
+    strip_key_modifiers(name)
+    for _, name in urwid.escape.input_sequences
+    if isinstance(name, str)
+} | {'enter', 'backspace', 'tab', 'esc'}
+
+
+def is_key(key):
+    """Is key something urwid could pass to keypress()?"""
+    key = strip_key_modifiers(key)
+    return len(key) == 1 or key in KEY_NAMES
+
+
+def edit_headless(items, heading, keys, size=(80, 24), move_key=None):
+    """Like edit(), but drive the editor with keys on a fake screen.
+
+    Keys are handled and the screen is rendered like urwid.MainLoop does;
+    stops after the last key, or on q.
+
+    Returns (items, moved_items, timings); timings is a list of KeyTiming,
+    with the time (in seconds) it took to handle the key and to render
+    the screen afterwards. The first one has key None, and is for
+    the initial render.
+
+    """
+    widget, checkboxlist, move_target = make_widget(items, heading, move_key)
+
+    # Like a real screen, keep a reference to the last canvas;
+    # urwid.CanvasCache only holds weak references.
+    screen = [None]
+
+    def render():
+        screen[0] = canvas = widget.render(size, focus=True)
+        # A real screen would go through all the rows.
+        for _ in canvas.content():
+            pass
+
+    timings = []
+    start = time.perf_counter()
+    render()
+    timings.append(KeyTiming(None, 0.0, time.perf_counter() - start))
+
+    for key in keys:
+        start = time.perf_counter()
+        try:
+            unhandled = widget.keypress(size, key)
+            if unhandled:
+                exit_on_q(unhandled)
+        except urwid.ExitMainLoop:
+            timings.append(KeyTiming(key, time.perf_counter() - start, 0.0))
+            break
+        keypress_end = time.perf_counter()
+        render()
+        timings.append(KeyTiming(key, keypress_end - start, time.perf_counter() - keypress_end))
+
+    return get_items(checkboxlist, move_target) + (timings, )
+
 
 if __name__ == '__main__':
 
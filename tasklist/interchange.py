@@ -0,0 +1,306 @@
+"""
+Machine-readable formats that round-trip losslessly with the markdown one.
+
+ndjson: one JSON object per line, one line per heading or item:
+
+    {"type":"heading","text":"today","level":1}
+    {"type":"item","text":"thing","checked":false,"priority":"a"}
+
+binary: a magic string followed by one record per heading or item;
+a record is a kind byte (b'#' or b'-'), the flags (the heading level,
+or checked | priority index << 1), the text length, and the UTF-8
+encoded text. Flags and length are unsigned LEB128 varints, so they
+take one byte each for almost all values.
+
+Both are imported into the markdown file, so values whose text would not
+survive rendering to markdown and parsing it back (e.g. ones with line
+breaks, or item texts starting with "[x] ") are rejected with ParseError.
+
+"""
+
+import io
+import json
+
+from .parser import Parser, ParseError
+from .renderer import Renderer
+from .types import Heading, Item
+
+
+PRIORITIES = ('', 'a', 'b', 'c')
+
+
+markdown_parser = Parser()
+markdown_renderer = Renderer()
+
+def check_markdown(value, line_no):
+    """Raise ParseError if value does not round-trip through markdown."""
+    if '\n' in value.text or '\r' in value.text:
+        raise ParseError("text contains line breaks", line_no)
+
+    # Only leading whitespace, and for items brackets, can be misparsed
+    # (closing ones too, e.g. '- (a) )' has priority 'a)').
+    text = value.text
+    if not text or not (text[0].isspace() or (isinstance(value, Item) and text[0] in '[]()')):
+        return value
+
+    if isinstance(value, Heading):
+        line = markdown_renderer.render_heading(value)
+        parse = markdown_parser.parse_heading
+    else:
+        line = markdown_renderer.render_item(value)
+        parse = markdown_parser.parse_item
+
+    try:
+        parsed = parse(line.rstrip('\n'), line_no)
+    except ParseError:
+        parsed = None
+    if parsed != value:
+        raise ParseError("text cannot be represented in markdown", line_no)
+
+    return value
+
+
+class NDJSONParser(Parser):
+
+    decoder = json.JSONDecoder()
+
+    def decode(self, line, line_no):
+        # Each line must be exactly one value; decoding lines joined
+        # together (e.g. as a JSON array) lets values span lines.
+        try:
+            return self.decoder.decode(line)
+        except ValueError:
+            raise ParseError("invalid json", line_no)
+
+    def parse_value(self, data, line_no):
+        if not isinstance(data, dict):
+            raise ParseError("invalid record", line_no)
+
+        type = data.get('type')
+        text = data.get('text')
+        if not isinstance(text, str):
+            raise ParseError("invalid record", line_no)
+
+        if type == 'heading':
+            level = data.get('level')
+            if not isinstance(level, int) or isinstance(level, bool) or level < 1:
+                raise ParseError("invalid record", line_no)
+            return check_markdown(Heading(text, level), line_no)
+
+        if type == 'item':
+            checked = data.get('checked', False)
+            if not isinstance(checked, bool):
+                raise ParseError("invalid record", line_no)
+            priority = data.get('priority', '')
+            if priority not in PRIORITIES:
+                raise ParseError("only the following allowed for priority: ' abc'", line_no)
+            return check_markdown(Item(text, checked, priority), line_no)
+
+        raise ParseError("invalid record", line_no)
+
+    def parse_into_values(self, lines):
+        for line_no, line in enumerate(lines):
+            if self.is_empty(line):
+                continue
+            yield line_no, self.parse_value(self.decode(line, line_no), line_no)
+
+
+class NDJSONRenderer(Renderer):
+
+    encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+    def dumps(self, data):
+        return self.encoder.encode(data) + '\n'
+
+    def render_block(self, block):
+        yield self.dumps({
+            'type': 'heading',
+            'text': block.heading.text,
+            'level': block.heading.level,
+        })
+        for item in block.items:
+            yield self.dumps({
+                'type': 'item',
+                'text': item.text,
+                'checked': item.checked,
+                'priority': item.priority,
+            })
+
+
+MAGIC = b'TLB2'
+
+
+def pack_varint(value):
+    if value < 0x80:
+        return bytes((value,))
+    rv = bytearray()
+    while value >= 0x80:
+        rv.append(value & 0x7f | 0x80)
+        value >>= 7
+    rv.append(value)
+    return bytes(rv)
+
+
+def unpack_varint(data, offset):
+    """Return (value, offset after it); raise IndexError if truncated."""
+    byte = data[offset]
+    if byte < 0x80:
+        return byte, offset + 1
+    value = shift = 0
+    while byte >= 0x80:
+        value |= (byte & 0x7f) << shift
+        shift += 7
+        offset += 1
+        byte = data[offset]
+    return value | byte << shift, offset + 1
+
+
+class BinaryParser(Parser):
+
+    """Parse the binary format; line numbers in errors are record numbers."""
+
+    def parse_into_values(self, file):
+        data = file.read()
+        if not data:
+            return
+        if not data.startswith(MAGIC):
+            raise ParseError("invalid magic")
+
+        offset = len(MAGIC)
+        record_no = 0
+        while offset < len(data):
+            kind = data[offset:offset+1]
+            try:
+                flags, length = data[offset+1], data[offset+2]
+                if flags < 0x80 and length < 0x80:
+                    # The common case; avoids two function calls.
+                    offset += 3
+                else:
+                    flags, offset = unpack_varint(data, offset + 1)
+                    length, offset = unpack_varint(data, offset)
+            except IndexError:
+                raise ParseError("truncated record", record_no)
+            if offset + length > len(data):
+                raise ParseError("truncated record", record_no)
+            try:
+                text = data[offset:offset+length].decode('utf-8')
+            except UnicodeDecodeError:
+                raise ParseError("invalid utf-8", record_no)
+            offset += length
+
+            if kind == b'#':
+                if flags < 1:
+                    raise ParseError("invalid record", record_no)
+                value = Heading(text, flags)
+            elif kind == b'-':
+                if flags >> 1 >= len(PRIORITIES):
+                    raise ParseError("only the following allowed for priority: ' abc'", record_no)
+                value = Item(text, bool(flags & 1), PRIORITIES[flags >> 1])
+            else:
+                raise ParseError("invalid record", record_no)
+
+            yield record_no, check_markdown(value, record_no)
+
+            record_no += 1
+
+    def parse(self, file):
+        if isinstance(file, (bytes, bytearray)):
+            file = io.BytesIO(file)
+        return super().parse(file)
+
+
+class BinaryRenderer(Renderer):
+
+    def pack(self, kind, flags, text):
+        text = text.encode('utf-8')
+        length = len(text)
+        if flags < 0x80 and length < 0x80:
+            # The common case; avoids two function calls.
+            return kind + bytes((flags, length)) + text
+        return kind + pack_varint(flags) + pack_varint(length) + text
+
+    def render_block(self, block):
+        yield self.pack(b'#', block.heading.level, block.heading.text)
+        for item in block.items:
+            flags = item.checked | PRIORITIES.index(item.priority) << 1
+            yield self.pack(b'-', flags, item.text)
+
+    def render_blocks(self, blocks):
+        yield MAGIC
+        yield from super().render_blocks(blocks)
+
+
+parsers = {
+    'ndjson': NDJSONParser(),
+    'binary': BinaryParser(),
+}
+
+renderers = {
+    'ndjson': NDJSONRenderer(),
+    'binary': BinaryRenderer(),
+}
+
+binary_formats = {'binary'}
+
+
+def export_blocks(blocks, file=None, format='ndjson'):
+    """Render blocks in format; file must be binary for binary formats."""
+    return renderers[format].render(blocks, file)
+
+
+def import_blocks(file, format='ndjson'):
+    """Parse blocks from format; file must be binary for binary formats."""
+    return parsers[format].parse(file)
+
+
+
+if __name__ == '__main__':
+
+    import random
+    import timeit
+
+    from .parser import parse
+    from .renderer import render
+    from .types import Block
+
+    random.seed(0)
+    words = 'lorem ipsum dolor sit amet consectetur adipiscing elit'.split()
+    blocks = [
+        Block(Heading('heading {}'.format(i), 1), [
+            Item(
+                ' '.join(random.choice(words) for _ in range(random.randint(1, 9))),
+                random.random() < .5,
+                random.choice(PRIORITIES),
+            )
+            for _ in range(1000)
+        ])
+        for i in range(100)
+    ]
+    n_items = sum(len(b.items) for b in blocks)
+
+    markdown = ''.join(render(blocks))
+    ndjson = ''.join(export_blocks(blocks, format='ndjson'))
+    binary = b''.join(export_blocks(blocks, format='binary'))
+
+    assert parse(markdown) == blocks
+    assert import_blocks(ndjson, 'ndjson') == blocks
+    assert import_blocks(binary, 'binary') == blocks
+
+    cases = [
+        ('markdown', len(markdown.encode('utf-8')),
+            lambda: parse(markdown), lambda: ''.join(render(blocks))),
+        ('ndjson', len(ndjson.encode('utf-8')),
+            lambda: import_blocks(ndjson, 'ndjson'),
+            lambda: ''.join(export_blocks(blocks, format='ndjson'))),
+        ('binary', len(binary),
+            lambda: import_blocks(binary, 'binary'),
+            lambda: b''.join(export_blocks(blocks, format='binary'))),
+    ]
+
+    print("{} items".format(n_items))
+    print("{:<10} {:>10} {:>16} {:>16}".format('format', 'bytes', 'read items/s', 'write items/s'))
+    for name, size, read, write in cases:
+        read_time = min(timeit.repeat(read, number=1, repeat=5))
+        write_time = min(timeit.repeat(write, number=1, repeat=5))
+        print("{:<10} {:>10} {:>16.0f} {:>16.0f}".format(
+            name, size, n_items / read_time, n_items / write_time))
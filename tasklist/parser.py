@@ -83,17 +83,19 @@ class Parser:
 
             raise ParseError("unknown markup", line_no)
 
-    def parse_into_blocks(self, file):
+    def parse_into_numbered_blocks(self, file):
+        heading_line_no = None
         heading = None
         items = []
 
         for line_no, value in self.parse_into_values(file):
             if isinstance(value, Heading):
                 if heading:
-                    yield heading, items
+                    yield heading_line_no, heading, items
                 else:
                     assert not items, "item before first heading"
 
+                heading_line_no = line_no
                 heading = value
                 items = []
 
@@ -107,8 +109,20 @@ class Parser:
                 assert False, "unexpected value type: {!r} (line {})".format(value, line_no)
 
         if heading:
+            yield heading_line_no, heading, items
+
+    def parse_into_blocks(self, file):
+        for _, heading, items in self.parse_into_numbered_blocks(file):
             yield heading, items
 
+    def check_headings(self, blocks):
+        headings = [b.heading.text for b in blocks]
+        heading_counts = Counter(headings)
+        duplicate_headings = [h for h in headings if heading_counts[h] > 1]
+        if duplicate_headings:
+            raise ParseError("headings appear multiple times: " +
+                             ', '.join(repr(h) for h in duplicate_headings))
+
     def parse(self, file):
         if isinstance(file, str):
             file = io.StringIO(file)
@@ -118,12 +132,7 @@ class Parser:
             for heading, items in self.parse_into_blocks(file)
         ]
 
-        headings = [b.heading.text for b in blocks]
-        heading_counts = Counter(headings)
-        duplicate_headings = [h for h in headings if heading_counts[h] > 1]
-        if duplicate_headings:
-            raise ParseError("headings appear multiple times: " +
-                             ', '.join(repr(h) for h in duplicate_headings))
+        self.check_headings(blocks)
 
         return blocks
 
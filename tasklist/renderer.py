@@ -1,16 +1,22 @@
 
 class Renderer:
 
+    def render_heading(self, heading):
+        return '{} {}\n'.format('#' * heading.level, heading.text)
+
+    def render_item(self, item):
+        return '- {}{}{}\n'.format(
+            '[x] ' if item.checked else '',
+            '({}) '.format(item.priority) if item.priority else '',
+            item.text,
+        )
+
     def render_block(self, block):
-        yield '{} {}\n'.format('#' * block.heading.level, block.heading.text)
+        yield self.render_heading(block.heading)
         yield '\n'
         if block.items:
             for item in block.items:
-                yield '- {}{}{}\n'.format(
-                    '[x] ' if item.checked else '',
-                    '({}) '.format(item.priority) if item.priority else '',
-                    item.text,
-                )
+                yield self.render_item(item)
             yield '\n'
 
     def render_blocks(self, blocks):
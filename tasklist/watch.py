@@ -0,0 +1,332 @@
+import os
+import io
+import time
+import bisect
+import select
+import struct
+import difflib
+from collections import namedtuple
+
+from .parser import Parser, ParseError
+from .renderer import Renderer
+from .types import Block
+
+
+Change = namedtuple('Change', 'kind heading old new')
+
+
+def common_prefix_length(a, b, limit=None):
+    """Length of the common prefix of a and b, at most limit.
+
+    Binary search with slice comparisons, which are done in C,
+    instead of comparing one character at a time.
+
+    """
+    lo, hi = 0, min(len(a), len(b))
+    if limit is not None:
+        hi = min(hi, limit)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[lo:mid] == b[lo:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def common_suffix_length(a, b, limit=None):
+    lo, hi = 0, min(len(a), len(b))
+    if limit is not None:
+        hi = min(hi, limit)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[len(a)-mid:len(a)-lo] == b[len(b)-mid:len(b)-lo]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+class IncrementalParser:
+
+    """Parse successive versions of a text, re-parsing only what changed.
+
+    Keeps the offsets of each block in the last text; on update, only the
+    blocks around the changed range (plus the one before it, in case a
+    heading was removed) are re-parsed. The Block objects of the other
+    blocks are reused as they are.
+
+    """
+
+    def __init__(self, parser=None):
+        self.parser = parser or Parser()
+        self.text = ''
+        self.starts = []
+        self.blocks = []
+
+    def parse_spans(self, text, start):
+        """Parse text into blocks; return their start offsets and the blocks.
+
+        Offsets are shifted by start.
+
+        """
+        line_offsets = [start]
+        for line in io.StringIO(text):
+            line_offsets.append(line_offsets[-1] + len(line))
+
+        starts = []
+        blocks = []
+        for line_no, heading, items in self.parser.parse_into_numbered_blocks(io.StringIO(text)):
+            starts.append(line_offsets[line_no])
+            blocks.append(Block(heading, items))
+
+        return starts, blocks
+
+    def update(self, text):
+        """Update to a new text; return the list of changes."""
+        old_text, old_starts, old_blocks = self.text, self.starts, self.blocks
+
+        prefix = common_prefix_length(old_text, text)
+        if prefix == len(old_text) == len(text):
+            return []
+        suffix = common_suffix_length(old_text, text, min(len(old_text), len(text)) - prefix)
+
+        changed_start = prefix
+        changed_end = len(old_text) - suffix
+
+        # The first affected block is the one containing the start of
+        # the change; the one before it is re-parsed too, since it gets
+        # its items if its heading is removed.
+        first = max(bisect.bisect_right(old_starts, changed_start) - 2, 0)
+        # The last affected block is the one containing the end of the
+        # change, or starting right at it.
+        last = bisect.bisect_right(old_starts, changed_end)
+
+        start = old_starts[first] if first > 0 else 0
+        end = old_starts[last] if last < len(old_starts) else len(old_text)
+        delta = len(text) - len(old_text)
+
+        # If parsing fails, the state remains the old one.
+        try:
+            new_starts, new_blocks = self.parse_spans(text[start:end+delta], start)
+        except ParseError as e:
+            if e.line is None:
+                raise
+            raise ParseError(e.message, e.line + text.count('\n', 0, start))
+
+        reused = {b.heading.text: b for b in old_blocks[first:last]}
+        new_blocks = [
+            reused[b.heading.text] if reused.get(b.heading.text) == b else b
+            for b in new_blocks
+        ]
+
+        blocks = old_blocks[:first] + new_blocks + old_blocks[last:]
+        self.parser.check_headings(blocks)
+
+        self.text = text
+        self.starts = (
+            old_starts[:first] + new_starts +
+            [s + delta for s in old_starts[last:]]
+        )
+        self.blocks = blocks
+
+        return diff_blocks(old_blocks[first:last], new_blocks)
+
+
+def diff_items(heading, old_items, new_items):
+    matcher = difflib.SequenceMatcher(
+        None, [i.text for i in old_items], [i.text for i in new_items], autojunk=False)
+
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        old, new = old_items[i1:i2], new_items[j1:j2]
+
+        if tag == 'equal':
+            for old_item, new_item in zip(old, new):
+                if old_item != new_item:
+                    yield Change('changed', heading, old_item, new_item)
+            continue
+
+        # A replaced item is most likely an edited one.
+        for old_item, new_item in zip(old, new):
+            yield Change('changed', heading, old_item, new_item)
+        for old_item in old[len(new):]:
+            yield Change('removed', heading, old_item, None)
+        for new_item in new[len(old):]:
+            yield Change('added', heading, None, new_item)
+
+
+def diff_blocks(old_blocks, new_blocks):
+    """Return the item changes between two lists of blocks.
+
+    Blocks are matched by heading text; blocks that are the same object
+    are not compared.
+
+    """
+    old_by_heading = {b.heading.text: b for b in old_blocks}
+    new_headings = {b.heading.text for b in new_blocks}
+    changes = []
+
+    for new_block in new_blocks:
+        old_block = old_by_heading.get(new_block.heading.text)
+        if old_block is new_block:
+            continue
+        old_items = old_block.items if old_block else []
+        changes.extend(diff_items(new_block.heading, old_items, new_block.items))
+
+    for old_block in old_blocks:
+        if old_block.heading.text not in new_headings:
+            changes.extend(diff_items(old_block.heading, old_block.items, []))
+
+    return changes
+
+
+renderer = Renderer()
+
+def format_change(change):
+    symbol = {'added': '+', 'removed': '-', 'changed': '~'}[change.kind]
+    items = [
+        renderer.render_item(item).rstrip('\n')
+        for item in (change.old, change.new) if item is not None
+    ]
+    return '{} {}: {}'.format(symbol, change.heading.text, ' -> '.join(items))
+
+
+class PollingWatcher:
+
+    """Wait for changes to a file by polling its stat() every interval seconds."""
+
+    def __init__(self, path, interval=.5):
+        self.path = path
+        self.interval = interval
+        self.last = self.stat()
+
+    def stat(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    def wait(self):
+        while True:
+            time.sleep(self.interval)
+            current = self.stat()
+            if current != self.last:
+                self.last = current
+                return
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+
+    """Wait for changes to a file using inotify (Linux only).
+
+    Watches the directory containing the file, so atomic replaces
+    (like the ones done by tasklist itself) are seen as well.
+
+    """
+
+    IN_CLOSE_WRITE = 0x8
+    IN_MOVED_FROM = 0x40
+    IN_MOVED_TO = 0x80
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_CLOEXEC = 0o2000000
+
+    mask = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    event = struct.Struct('iIII')
+
+    # Events arriving this soon after one another are handled together.
+    settle = .05
+
+    def __init__(self, path):
+        import ctypes
+        import ctypes.util
+
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = libc.inotify_init1(self.IN_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+        directory, self.name = os.path.split(os.path.abspath(path))
+        self.name = os.fsencode(self.name)
+        wd = libc.inotify_add_watch(self.fd, os.fsencode(directory), self.mask)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, os.strerror(errno))
+
+    def read_names(self):
+        data = os.read(self.fd, 64 * 1024)
+        offset = 0
+        while offset < len(data):
+            _, _, _, length = self.event.unpack_from(data, offset)
+            offset += self.event.size
+            yield data[offset:offset+length].rstrip(b'\0')
+            offset += length
+
+    def wait(self):
+        while self.name not in set(self.read_names()):
+            pass
+        while select.select([self.fd], [], [], self.settle)[0]:
+            list(self.read_names())
+
+    def close(self):
+        os.close(self.fd)
+
+
+def make_watcher(path, interval=.5, polling=False):
+    """Return an InotifyWatcher if possible, a PollingWatcher otherwise."""
+    if not polling:
+        try:
+            return InotifyWatcher(path)
+        except (OSError, AttributeError, TypeError):
+            pass
+    return PollingWatcher(path, interval)
+
+
+def read_text(path):
+    try:
+        with open(path) as f:
+            return f.read()
+    except FileNotFoundError:
+        return ''
+
+
+
+if __name__ == '__main__':
+
+    import timeit
+
+    from .parser import parse
+    from .types import Heading, Item
+
+    renderer = Renderer()
+
+    print("{:>8} {:>12} {:>12}".format('items', 'parse', 'update'))
+    for n_blocks in (10, 100, 1000):
+        blocks = [
+            Block(Heading('heading {}'.format(i), 1), [
+                Item('item {} {}'.format(i, j), False, '')
+                for j in range(100)
+            ])
+            for i in range(n_blocks)
+        ]
+        text = ''.join(renderer.render(blocks))
+        other = text.replace('- item 5 50\n', '- [x] item 5 50\n')
+
+        parser = IncrementalParser()
+        parser.update(text)
+        texts = [text, other]
+
+        def update():
+            texts.reverse()
+            parser.update(texts[0])
+
+        parse_time = min(timeit.repeat(lambda: parse(text), number=1, repeat=5))
+        update_time = min(timeit.repeat(update, number=10, repeat=5)) / 10
+        print("{:>8} {:>10.2f}ms {:>10.2f}ms".format(
+            n_blocks * 100, parse_time * 1000, update_time * 1000))
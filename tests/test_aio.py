@@ -0,0 +1,164 @@
+import asyncio
+import concurrent.futures
+import io
+import socket
+
+import pytest
+
+from tasklist.types import Heading, Item, Block
+from tasklist.aio import AsyncParser, AsyncRenderer, process_file
+
+
+text = """\
+# one
+
+- item one-one
+- [x] (a) item one-two
+
+# two
+
+"""
+
+blocks = [
+    Block(Heading('one', 1), [
+        Item('item one-one', False, ''),
+        Item('item one-two', True, 'a'),
+    ]),
+    Block(Heading('two', 1), []),
+]
+
+
+async def aiter_lines(text):
+    for line in io.StringIO(text):
+        await asyncio.sleep(0)
+        yield line
+
+
+class AsyncWriter:
+
+    def __init__(self):
+        self.chunks = []
+
+    async def write(self, chunk):
+        self.chunks.append(chunk)
+
+
+class DrainingWriter(io.StringIO):
+
+    drained = 0
+
+    async def drain(self):
+        self.drained += 1
+
+
+@pytest.mark.parametrize('threshold', [0, 1000])
+@pytest.mark.parametrize('source', [
+    lambda: text,
+    lambda: io.StringIO(text),
+    lambda: text.splitlines(True),
+    lambda: aiter_lines(text),
+])
+def test_parse(source, threshold):
+    parser = AsyncParser(threshold=threshold)
+    assert asyncio.run(parser.parse(source())) == blocks
+
+
+@pytest.mark.parametrize('encoding, data', [
+    (None, text.encode('utf-8')),
+    ('utf-16', text.encode('utf-16')),
+    (None, text.replace('\n', '\r\n').encode('utf-8')),
+])
+def test_parse_stream_reader(encoding, data):
+
+    async def main():
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        return await AsyncParser(threshold=0).parse(reader, encoding)
+
+    assert asyncio.run(main()) == blocks
+
+
+def test_process_pool():
+    with concurrent.futures.ProcessPoolExecutor(1) as executor:
+        parser = AsyncParser(executor=executor, threshold=0)
+        assert asyncio.run(parser.parse(io.StringIO(text))) == blocks
+        renderer = AsyncRenderer(executor=executor, threshold=0)
+        assert asyncio.run(renderer.render(blocks)) == text
+
+
+@pytest.mark.parametrize('threshold', [0, 1000])
+def test_render(threshold):
+    renderer = AsyncRenderer(threshold=threshold)
+    assert asyncio.run(renderer.render(blocks)) == text
+
+    writer = AsyncWriter()
+    asyncio.run(renderer.render(blocks, writer))
+    assert ''.join(writer.chunks) == text
+
+    writer = DrainingWriter()
+    asyncio.run(renderer.render(blocks, writer))
+    assert writer.getvalue() == text
+    assert writer.drained == 1
+
+
+class BytesWriter:
+
+    def __init__(self):
+        self.chunks = []
+
+    async def write(self, chunk):
+        assert isinstance(chunk, bytes)
+        self.chunks.append(chunk)
+
+
+def test_render_encoding():
+    writer = BytesWriter()
+    blocks = [Block(Heading('îtém', 1), [])]
+    asyncio.run(AsyncRenderer().render(blocks, writer, 'utf-8'))
+    assert b''.join(writer.chunks) == '# îtém\n\n'.encode('utf-8')
+
+
+@pytest.mark.parametrize('encoding', [None, 'utf-8'])
+def test_render_stream_writer(encoding):
+
+    async def main():
+        left, right = socket.socketpair()
+        _, writer = await asyncio.open_connection(sock=left)
+        reader, other_writer = await asyncio.open_connection(sock=right)
+
+        # a chunk size smaller than the text, so drain() is called between writes
+        renderer = AsyncRenderer()
+        renderer.chunk_size = 7
+        await renderer.render(blocks, writer, encoding)
+        writer.close()
+        data = await reader.read()
+        other_writer.close()
+        return data
+
+    assert asyncio.run(main()) == text.encode('utf-8')
+
+
+def test_process_file():
+
+    def set_checked(blocks):
+        blocks[0].items[:] = [i._replace(checked=True) for i in blocks[0].items]
+
+    async def add_item(blocks):
+        await asyncio.sleep(0)
+        blocks[1].items.append(Item('item two-one', False, 'b'))
+
+    writer = AsyncWriter()
+    asyncio.run(process_file([set_checked, add_item], aiter_lines(text), writer))
+
+    assert ''.join(writer.chunks) == """\
+# one
+
+- [x] item one-one
+- [x] (a) item one-two
+
+# two
+
+- (b) item two-one
+
+"""
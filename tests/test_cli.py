@@ -0,0 +1,131 @@
+import pytest
+
+pytest.importorskip('click')
+
+from click.testing import CliRunner
+
+import tasklist.watch
+from tasklist.cli import cli
+from tasklist.parser import ParseError
+
+
+class StopWatching(Exception):
+    pass
+
+
+@pytest.fixture
+def stop_watching(monkeypatch):
+    """Make watch stop after the first (re)parse."""
+
+    class Watcher:
+        def wait(self):
+            raise StopWatching
+        def close(self):
+            pass
+
+    monkeypatch.setattr(tasklist.watch, 'make_watcher', lambda *args: Watcher())
+
+
+def test_watch_invalid_file(tmp_path, stop_watching):
+    path = tmp_path / 'tasklist.md'
+    path.write_text('# bad\nnope\n')
+
+    result = CliRunner().invoke(cli, [str(path), 'watch'])
+    assert isinstance(result.exception, StopWatching)
+    assert "error: unknown markup (line 2)" in result.output
+    assert path.read_text() == '# bad\nnope\n'
+
+
+def test_watch_after_commands(tmp_path, stop_watching):
+    path = tmp_path / 'tasklist.md'
+    path.write_text('# one\n\n- a\n\n# two\n\n')
+
+    result = CliRunner().invoke(cli, [str(path), 'set', '--checked', 'one', 'watch'])
+    assert isinstance(result.exception, StopWatching)
+    assert result.output == "+ one: - [x] a\n"
+    assert path.read_text() == '# one\n\n- [x] a\n\n# two\n\n'
+
+
+def test_watch_not_last(tmp_path, stop_watching):
+    path = tmp_path / 'tasklist.md'
+    path.write_text('# one\n\n- a\n\n')
+
+    result = CliRunner().invoke(cli, [str(path), 'watch', 'set', '--checked', 'one'])
+    assert result.exit_code == 2
+    assert "watch must be the last command" in result.output
+    assert path.read_text() == '# one\n\n- a\n\n'
+
+
+def test_edit_replay(tmp_path):
+    pytest.importorskip('urwid')
+
+    path = tmp_path / 'tasklist.md'
+    path.write_text('# one\n\n- a\n- b\n\n')
+    keys = tmp_path / 'keys.txt'
+    keys.write_text('x\ndown\nb\n')
+
+    result = CliRunner().invoke(cli, [
+        str(path), 'edit', '--replay', str(keys), '--timings', 'one'])
+    assert result.exit_code == 0, result.output
+    assert path.read_text() == '# one\n\n- [x] a\n- (b) b\n\n'
+
+    # with CliRunner, stderr is mixed into output
+    timings = [line.split('\t') for line in result.output.splitlines()]
+    assert [t[0] for t in timings] == ['None', 'x', 'down', 'b']
+    assert all(float(t[1]) >= 0 and float(t[2]) >= 0 for t in timings)
+
+
+@pytest.mark.parametrize('key', ['ab', 'foo', 'ctrl '])
+def test_edit_replay_unknown_key(tmp_path, key):
+    pytest.importorskip('urwid')
+
+    path = tmp_path / 'tasklist.md'
+    path.write_text('# one\n\n- a\n\n')
+    keys = tmp_path / 'keys.txt'
+    keys.write_text('x\n{}\n'.format(key))
+
+    result = CliRunner().invoke(cli, [str(path), 'edit', '--replay', str(keys), 'one'])
+    assert result.exit_code == 2
+    assert "unknown key on line 2: {!r}".format(key) in result.output
+    assert path.read_text() == '# one\n\n- a\n\n'
+
+
+markdown = """\
+# one
+
+- a
+- [x] (b) îtém
+
+# two
+
+"""
+
+
+@pytest.mark.parametrize('format', ['ndjson', 'binary'])
+def test_export_import(tmp_path, format):
+    path = tmp_path / 'tasklist.md'
+    path.write_text(markdown)
+    exported = tmp_path / 'exported'
+
+    result = CliRunner().invoke(cli, [
+        str(path), 'export', '--format', format, str(exported)])
+    assert result.exit_code == 0, result.output
+    assert path.read_text() == markdown
+
+    other = tmp_path / 'other.md'
+    other.write_text('# three\n\n')
+    result = CliRunner().invoke(cli, [
+        str(other), 'import', '--format', format, str(exported)])
+    assert result.exit_code == 0, result.output
+    assert other.read_text() == markdown
+
+
+def test_import_invalid(tmp_path):
+    path = tmp_path / 'tasklist.md'
+    path.write_text(markdown)
+    imported = tmp_path / 'imported.ndjson'
+    imported.write_text('{"type":"item","text":"a"}\n')
+
+    result = CliRunner().invoke(cli, [str(path), 'import', str(imported)])
+    assert isinstance(result.exception, ParseError)
+    assert path.read_text() == markdown
@@ -0,0 +1,85 @@
+import pytest
+
+pytest.importorskip('urwid')
+
+from tasklist.types import Heading, Item
+from tasklist.editor import edit_headless, make_widget
+
+
+items = [
+    Item('one', False, ''),
+    Item('two', False, ''),
+    Item('three', True, 'a'),
+]
+
+data = [
+    ([],
+        items, []),
+    (['x', 'down', 'x', 'x'],
+        [Item('one', True, ''), Item('two', False, ''), Item('three', True, 'a')], []),
+    # setting the priority moves to the next item
+    (['b', 'c', 'd'],
+        [Item('one', False, 'b'), Item('two', False, 'c'), Item('three', True, '')], []),
+    (['down', 'e', 'end', '!', 'enter', 'x'],
+        [Item('one', False, ''), Item('two!', True, ''), Item('three', True, 'a')], []),
+    # moving away from a label stops editing it
+    (['e', 'z', 'down', 'x'],
+        [Item('onez', False, ''), Item('two', True, ''), items[2]], []),
+    (['e', 'z', 'down', 'up', 'x'],
+        [Item('onez', True, ''), items[1], items[2]], []),
+    (['n', 'f', 'o', 'u', 'r', 'enter', 'a'],
+        items + [Item('four', False, 'a')], []),
+    (['down', 'r'],
+        [items[0], items[2]], []),
+    (['r', 'r', 'r', 'r', 'x', 'n', 'o', 'n', 'e', 'enter'],
+        [Item('one', False, '')], []),
+    (['down', 'l', 'l'],
+        [items[0]], [items[1], items[2]]),
+    (['x', 'q', 'x'],
+        [Item('one', True, ''), items[1], items[2]], []),
+]
+
+@pytest.mark.parametrize('keys, expected_items, expected_moved_items', data)
+def test_edit_headless(keys, expected_items, expected_moved_items):
+    new_items, moved_items, timings = edit_headless(
+        items, Heading('heading', 1), keys, size=(40, 10), move_key='l')
+    assert new_items == expected_items
+    assert moved_items == expected_moved_items
+
+    keys = keys[:keys.index('q') + 1] if 'q' in keys else keys
+    assert [t.key for t in timings] == [None] + keys
+    assert all(t.keypress >= 0 and t.render >= 0 for t in timings)
+
+
+def test_edit_headless_large():
+    items = [Item('item {}'.format(i), False, '') for i in range(2000)]
+    keys = ['down'] * 1500 + ['x', 'e', 'z', 'enter', 'up', 'b', 'l']
+    new_items, moved_items, _ = edit_headless(
+        items, Heading('heading', 1), keys, size=(40, 10), move_key='l')
+    # setting the priority moves to the next item, which then gets moved
+    assert new_items[1499] == Item('item 1499', False, 'b')
+    assert new_items[1500] == Item('item 1501', False, '')
+    assert moved_items == [Item('item 1500z', True, '')]
+    assert len(new_items) == 1999
+
+
+@pytest.mark.parametrize('item, keys, expected_row', [
+    (Item('one', False, ''), ['x'], '- [x] one'),
+    (Item('one', True, 'b'), ['x'], '- (b) one'),
+    (Item('one', True, 'b'), ['x', 'x'], '- [x] (b) one'),
+    (Item('one', False, ''), ['a'], '- (a) one'),
+    (Item('one', False, 'a'), ['d'], '- one'),
+])
+def test_edit_rendered(item, keys, expected_row):
+    widget, _, _ = make_widget([item], Heading('heading', 1))
+    size = (40, 5)
+
+    # Keep a reference to the canvas between keys, like a real screen,
+    # so unchanged rows come from the canvas cache.
+    canvas = widget.render(size, focus=True)
+    for key in keys:
+        widget.keypress(size, key)
+        canvas = widget.render(size, focus=True)
+
+    rows = [row.decode().rstrip() for row in canvas.text]
+    assert rows[:3] == ['# heading', '', expected_row]
@@ -0,0 +1,160 @@
+import io
+
+import pytest
+
+from tasklist.types import Heading, Item, Block
+from tasklist.parser import ParseError, parse
+from tasklist.renderer import render
+from tasklist.interchange import export_blocks, import_blocks
+from tasklist.interchange import pack_varint, unpack_varint
+
+
+markdown = """\
+## one
+
+# two
+
+- item two-one
+- [x] item two-two
+- (a) item two-three
+- [x] (c) îtém "two-four" \\ {}
+
+## three
+
+- [x] (b) item three-one
+
+"""
+
+
+@pytest.mark.parametrize('format, join, file_type', [
+    ('ndjson', ''.join, io.StringIO),
+    ('binary', b''.join, io.BytesIO),
+])
+def test_round_trip(format, join, file_type):
+    blocks = parse(markdown)
+
+    data = join(export_blocks(blocks, format=format))
+    file = file_type()
+    export_blocks(blocks, file, format)
+    assert file.getvalue() == data
+
+    assert import_blocks(data, format) == blocks
+    assert import_blocks(file_type(data), format) == blocks
+    assert ''.join(render(import_blocks(data, format))) == markdown
+
+
+@pytest.mark.parametrize('format, empty', [('ndjson', ''), ('binary', b'')])
+def test_empty(format, empty):
+    assert import_blocks(empty, format) == []
+
+
+def test_ndjson_format():
+    blocks = [Block(Heading('one', 2), [Item('two', True, 'a')])]
+    assert ''.join(export_blocks(blocks, format='ndjson')) == (
+        '{"type":"heading","text":"one","level":2}\n'
+        '{"type":"item","text":"two","checked":true,"priority":"a"}\n'
+    )
+
+
+ndjson_errors = [
+    ('{"type":"heading","text":"one","level":1}\n{', ("invalid json", 1)),
+    ('[]', ("invalid record", 0)),
+    ('{"type":"heading","text":"one","level":0}', ("invalid record", 0)),
+    ('{"type":"heading","text":"one","level":1}\n{"type":"item","text":1}',
+        ("invalid record", 1)),
+    ('{"type":"heading","text":"one","level":1}\n\n{"type":"other","text":"x"}',
+        ("invalid record", 2)),
+    ('{"type":"heading","text":"one","level":1}\n'
+     '{"type":"item","text":"two","priority":"x"}',
+        ("only the following allowed for priority: ' abc'", 1)),
+    ('{"type":"item","text":"two"}', ("item before first heading", 0)),
+    # a single line that would be two values in a JSON array
+    ('{"type":"heading","text":"one","level":1}\n'
+     '{"type":"item","text":"x"},{"type":"item","text":"y"}\n'
+     '{"type":"item","text":"z"}',
+        ("invalid json", 1)),
+    # a value spanning lines
+    ('{"type":"item","text":"a"},{"type":"item","text":"b","x":[0\n1]}',
+        ("invalid json", 0)),
+    ('{"type":"heading","text":"one","level":1}\n'
+     '{"type":"item","text":"a"},{"type":"item","text":"b","x":[0\n'
+     '1]}',
+        ("invalid json", 1)),
+]
+
+@pytest.mark.parametrize('input, error_args', ndjson_errors)
+def test_ndjson_error(input, error_args):
+    with pytest.raises(ParseError) as excinfo:
+        import_blocks(input, 'ndjson')
+    assert excinfo.value.args == error_args
+
+
+@pytest.mark.parametrize('value, data', [
+    (0, b'\x00'),
+    (127, b'\x7f'),
+    (128, b'\x80\x01'),
+    (300, b'\xac\x02'),
+    (2 ** 32, b'\x80\x80\x80\x80\x10'),
+])
+def test_varint(value, data):
+    assert pack_varint(value) == data
+    assert unpack_varint(b'x' + data + b'y', 1) == (value, 1 + len(data))
+    with pytest.raises(IndexError):
+        unpack_varint(data[:-1], 0)
+
+
+def record(kind, flags, text):
+    return kind + pack_varint(flags) + pack_varint(len(text)) + text
+
+binary_errors = [
+    (b'nope', ("invalid magic", None)),
+    (b'TLB2' + record(b'#', 1, b'one')[:-1], ("truncated record", 0)),
+    (b'TLB2' + record(b'#', 1, b'one') + b'#\x01', ("truncated record", 1)),
+    (b'TLB2' + record(b'#', 1, b'one') + b'-\x80', ("truncated record", 1)),
+    (b'TLB2' + record(b'#', 0, b'one'), ("invalid record", 0)),
+    (b'TLB2' + record(b'#', 1, b'one') + record(b'-', 8, b'two'),
+        ("only the following allowed for priority: ' abc'", 1)),
+    (b'TLB2' + record(b'-', 0, b'two'), ("item before first heading", 0)),
+    (b'TLB2' + record(b'#', 1, b'one') + record(b'-', 0, b'[x] two'),
+        ("text cannot be represented in markdown", 1)),
+]
+
+@pytest.mark.parametrize('input, error_args', binary_errors)
+def test_binary_error(input, error_args):
+    with pytest.raises(ParseError) as excinfo:
+        import_blocks(input, 'binary')
+    assert excinfo.value.args == error_args
+
+
+def test_deep_heading():
+    blocks = [Block(Heading('deep', 300), [Item('item', False, '')])]
+    for format, join in ('ndjson', ''.join), ('binary', b''.join):
+        data = join(export_blocks(blocks, format=format))
+        assert import_blocks(data, format) == blocks
+
+
+@pytest.mark.parametrize('value, message', [
+    (Heading('one\ntwo', 1), "text contains line breaks"),
+    (Heading('one\rtwo', 1), "text contains line breaks"),
+    (Heading(' one', 1), "text cannot be represented in markdown"),
+    (Item('one\ntwo', False, ''), "text contains line breaks"),
+    (Item(' one', False, ''), "text cannot be represented in markdown"),
+    (Item('[x] one', False, ''), "text cannot be represented in markdown"),
+    (Item('[] one', False, ''), "text cannot be represented in markdown"),
+    (Item('(a) one', True, ''), "text cannot be represented in markdown"),
+    (Item('(see) one', False, ''), "text cannot be represented in markdown"),
+    (Item(') one', False, 'a'), "text cannot be represented in markdown"),
+    (Item('] one', True, ''), "text cannot be represented in markdown"),
+])
+@pytest.mark.parametrize('format, join', [('ndjson', ''.join), ('binary', b''.join)])
+def test_not_representable_in_markdown(format, join, value, message):
+    heading = Heading('heading', 1)
+    if isinstance(value, Heading):
+        blocks, line_no = [Block(value, [])], 0
+    else:
+        blocks, line_no = [Block(heading, [value])], 1
+    data = join(export_blocks(blocks, format=format))
+
+    with pytest.raises(ParseError) as excinfo:
+        import_blocks(data, format)
+    assert excinfo.value.args == (message, line_no)
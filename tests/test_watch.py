@@ -0,0 +1,185 @@
+import random
+import sys
+
+import pytest
+
+from tasklist.types import Heading, Item, Block
+from tasklist.parser import ParseError, parse
+from tasklist.watch import IncrementalParser, Change, diff_blocks, format_change
+from tasklist.watch import common_prefix_length, common_suffix_length
+from tasklist.watch import PollingWatcher, InotifyWatcher
+
+
+@pytest.mark.parametrize('a, b, prefix, suffix', [
+    ('', '', 0, 0),
+    ('abc', '', 0, 0),
+    ('abc', 'abc', 3, 3),
+    ('abcd', 'abxd', 2, 1),
+    ('abab', 'ab', 2, 2),
+    ('xab', 'yab', 0, 2),
+])
+def test_common_lengths(a, b, prefix, suffix):
+    assert common_prefix_length(a, b) == prefix
+    assert common_suffix_length(a, b) == suffix
+
+
+text = """\
+
+# one
+
+- one-one
+- one-two
+
+# two
+
+- two-one
+
+# three
+
+# four
+
+- four-one
+- four-two
+- four-three
+
+"""
+
+edits = [
+    ('- one-two', '- [x] one-two'),
+    ('- one-two\n', ''),
+    ('- one-two\n', '- one-two\n- one-three\n'),
+    ('# two\n', ''),
+    ('# two\n', '- two\n'),
+    ('# three\n', '# three\n\n- three-one\n'),
+    ('- two-one\n', '- two-one\n\n# five\n'),
+    ('\n# one', '# zero\n\n# one'),
+    ('# four', '# for'),
+    ('- four-three\n', ''),
+    ('two-one\n\n# three', 'three'),
+    ('e\n\n# four', 'e\n# four'),
+    ('# four\n', '# four\n# five\n'),
+    ('- four-three\n\n', '- four-three'),
+    (text, ''),
+]
+
+@pytest.mark.parametrize('old, new', edits)
+def test_incremental_parse(old, new):
+    new_text = text.replace(old, new)
+
+    parser = IncrementalParser()
+    parser.update(text)
+    old_blocks = list(parser.blocks)
+
+    changes = parser.update(new_text)
+    assert parser.blocks == parse(new_text)
+    assert changes == diff_blocks(parse(text), parse(new_text))
+
+    # blocks that did not change are not re-created
+    for block in parser.blocks:
+        if block in old_blocks:
+            assert any(block is b for b in old_blocks)
+
+
+def test_incremental_parse_random():
+    rng = random.Random(0)
+    lines = ['# one\n', '# two\n', '# three\n', '- item\n', '- [x] item\n',
+             '- (a) other\n', '\n']
+
+    def random_text():
+        return '# start\n' + ''.join(rng.choice(lines[3:]) for _ in range(rng.randint(0, 10)))
+
+    parser = IncrementalParser()
+    current = ''
+    for _ in range(500):
+        new = current.splitlines(True)
+        position = rng.randint(0, len(new))
+        if rng.random() < .5 and new:
+            del new[position:position + rng.randint(1, 3)]
+        else:
+            new[position:position] = [rng.choice(lines)]
+        new = ''.join(new) or random_text()
+
+        try:
+            expected = parse(new)
+        except ParseError as e:
+            with pytest.raises(ParseError) as excinfo:
+                parser.update(new)
+            assert excinfo.value.args == e.args
+            # state is unchanged
+            assert parser.blocks == parse(current)
+            continue
+
+        old_blocks = parser.blocks
+        changes = parser.update(new)
+        assert parser.blocks == expected
+        assert changes == diff_blocks(old_blocks, expected)
+        current = new
+
+
+def test_incremental_parse_error_line():
+    parser = IncrementalParser()
+    parser.update(text)
+    with pytest.raises(ParseError) as excinfo:
+        parser.update(text.replace('- four-two', 'four-two'))
+    assert excinfo.value.args == ("unknown markup", 15)
+    assert parser.blocks == parse(text)
+
+    with pytest.raises(ParseError) as excinfo:
+        parser.update(text.replace('# four', '# one'))
+    assert excinfo.value.args == ("headings appear multiple times: 'one', 'one'", None)
+    assert parser.blocks == parse(text)
+
+
+def test_diff_blocks():
+    old = [
+        Block(Heading('one', 1), [
+            Item('a', False, ''), Item('b', False, ''), Item('c', False, ''),
+        ]),
+        Block(Heading('two', 1), [Item('d', False, '')]),
+    ]
+    new = [
+        Block(Heading('one', 1), [
+            Item('a', True, ''), Item('c', False, ''), Item('e', False, 'a'),
+        ]),
+        Block(Heading('three', 1), [Item('d', False, '')]),
+    ]
+    one, two, three = Heading('one', 1), Heading('two', 1), Heading('three', 1)
+    assert diff_blocks(old, new) == [
+        Change('changed', one, Item('a', False, ''), Item('a', True, '')),
+        Change('removed', one, Item('b', False, ''), None),
+        Change('added', one, None, Item('e', False, 'a')),
+        Change('added', three, None, Item('d', False, '')),
+        Change('removed', two, Item('d', False, ''), None),
+    ]
+
+
+@pytest.mark.parametrize('change, string', [
+    (Change('added', Heading('one', 1), None, Item('a', True, 'b')),
+        "+ one: - [x] (b) a"),
+    (Change('removed', Heading('one', 1), Item('a', False, ''), None),
+        "- one: - a"),
+    (Change('changed', Heading('one', 1), Item('a', False, ''), Item('b', False, 'c')),
+        "~ one: - a -> - (c) b"),
+])
+def test_format_change(change, string):
+    assert format_change(change) == string
+
+
+def test_polling_watcher(tmp_path):
+    path = tmp_path / 'tasklist.md'
+    watcher = PollingWatcher(str(path), interval=.01)
+    path.write_text('# one\n')
+    watcher.wait()
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason="needs inotify")
+def test_inotify_watcher(tmp_path):
+    path = tmp_path / 'tasklist.md'
+    (tmp_path / 'other.md').write_text('# one\n')
+    watcher = InotifyWatcher(str(path))
+    try:
+        (tmp_path / 'other.md').write_text('# two\n')
+        path.write_text('# one\n')
+        watcher.wait()
+    finally:
+        watcher.close()